@@ -0,0 +1,743 @@
+import itertools
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import tkinter as tk
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import folder_tree_generator as ftg
+
+
+def _make_tree(root):
+    """Creates a small tree with nested, empty, hidden and excluded folders."""
+    os.makedirs(os.path.join(root, 'a', 'b', 'c'))
+    os.makedirs(os.path.join(root, 'B'))
+    os.makedirs(os.path.join(root, '.hid'))
+    os.makedirs(os.path.join(root, 'node_modules', 'x'))
+    for name in ['a/f.txt', 'a/b/c/deep', 'Z.py', '.hidden', 'quote"name', 'ünï cödé']:
+        with open(os.path.join(root, *name.split('/')), 'w') as f:
+            f.write('hi')
+    try:
+        os.symlink('a', os.path.join(root, 'link'))
+        os.symlink('nowhere', os.path.join(root, 'bad'))
+    except (OSError, NotImplementedError):
+        pass
+
+
+class _RecordingRoot:
+    """Stands in for the Tk root, recording root.after callbacks instead of running them."""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = []
+        self.cancelled = []
+        self._changed = threading.Condition()
+
+    def after(self, ms, func, *args):
+        with self._changed:
+            self.calls.append((func.__name__, args))
+            self.threads.append(threading.current_thread())
+            self._changed.notify_all()
+            return len(self.calls) - 1
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+    def wait_for(self, name, count=1, timeout=10):
+        """Waits until func has been scheduled count times; returns False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: sum(n == name for n, _ in self.calls) >= count, timeout)
+
+
+def _headless_app():
+    """Returns an app without widgets whose Tk callbacks land in app.root.calls."""
+    app = ftg.FolderTreeGeneratorApp.__new__(ftg.FolderTreeGeneratorApp)
+    app.root = _RecordingRoot()
+    return app
+
+
+class _StubFrame:
+    def __init__(self):
+        self._exists = True
+
+    def destroy(self):
+        self._exists = False
+
+    def winfo_exists(self):
+        return self._exists
+
+
+class _StubPreview:
+    """Stands in for the preview ScrolledText, keeping its text, state and packing."""
+
+    def __init__(self):
+        self.frame = _StubFrame()
+        self.text = ""
+        self.state = 'normal'
+        self.packed = False
+
+    def insert(self, index, text):
+        # Like Tk, a disabled widget ignores inserts
+        if self.state == 'normal':
+            self.text += text
+
+    def configure(self, state):
+        self.state = state
+
+    def pack(self, **kwargs):
+        self.packed = True
+
+    def pack_forget(self):
+        self.packed = False
+
+
+def _headless_preview_app(nodes=()):
+    """Returns a headless app whose preview widgets are _StubPreview instances."""
+    app = _headless_app()
+    app._create_preview_text = _StubPreview
+    app.preview_text = _StubPreview()
+    app.preview_text.pack()
+    app._back_preview = None
+    app.tree_nodes = list(nodes)
+    app.progress_bar = mock.Mock()
+    return app
+
+
+class TreeTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.root = os.path.join(cls._tmp.name, 'tree')
+        _make_tree(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+
+class GenerateTreeTests(TreeTestCase):
+    def test_default_output(self):
+        expected = [
+            self.root,
+            "├── a",
+            "│   ├── b",
+            "│   │   └── c",
+            "│   │       └── deep",
+            "│   └── f.txt",
+            "├── B",
+        ]
+        lines = ftg.generate_tree(self.root, exclusions=['node_modules']).split('\n')
+        self.assertEqual(lines[:len(expected)], expected)
+        self.assertNotIn("├── .hid", lines)
+
+    def test_hidden_and_excluded_entries(self):
+        tree = ftg.generate_tree(self.root, include_hidden=True, exclusions=['node_modules', 'b'])
+        self.assertIn("├── .hid\n├── .hidden\n├── a\n│   └── f.txt\n├── B\n", tree)
+        self.assertNotIn("node_modules", tree)
+
+    def test_symlinks_are_listed_not_followed(self):
+        if not os.path.islink(os.path.join(self.root, 'link')):
+            self.skipTest("symlinks not supported")
+        tree = ftg.generate_tree(self.root)
+        self.assertIn("├── bad -> nowhere\n├── link -> a\n", tree)
+        self.assertEqual(tree.count("f.txt"), 1)
+
+    def test_metadata_label(self):
+        tree = ftg.generate_tree(self.root, show_metadata=True)
+        self.assertIn("Z.py [Size: 2 bytes, Modified: ", tree)
+        self.assertIn("├── a\n", tree)
+
+    def test_metadata_timestamp_matches_strftime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'f')
+            open(path, 'w').close()
+            for ns in [0, 1_700_000_000_999_999_999, 1_711_846_800_500_000_000]:
+                os.utime(path, ns=(ns, ns))
+                stamp = datetime.fromtimestamp(os.stat(path).st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+                with self.subTest(ns=ns):
+                    self.assertEqual(ftg.generate_tree(tmp, show_metadata=True).split('\n')[1],
+                                     f"└── f [Size: 0 bytes, Modified: {stamp}]")
+
+    def test_max_depth_truncates(self):
+        tree = ftg.generate_tree(self.root, max_depth=2, symbols=ftg.TREE_SYMBOLS['Simple'])
+        self.assertIn("|   |-- b\n|   |   \\-- ...", tree)
+        self.assertNotIn("deep", tree)
+
+    def test_symbol_styles(self):
+        for style, expected in [('Classic', "│   └── f.txt\n├── B\n"),
+                                ('Simple', "|   \\-- f.txt\n|-- B\n"),
+                                ('ASCII', "    +-- f.txt\n+-- B\n")]:
+            with self.subTest(style=style):
+                tree = ftg.generate_tree(self.root, symbols=ftg.TREE_SYMBOLS[style])
+                self.assertIn(expected, tree)
+
+    def test_unreadable_root(self):
+        missing = os.path.join(self.root, 'missing')
+        lines = ftg.generate_tree(missing).split('\n')
+        self.assertEqual(lines[0], missing)
+        self.assertTrue(lines[1].startswith("└── [Error: "), lines[1])
+        self.assertEqual(len(lines), 2)
+
+    def test_tree_deeper_than_the_recursion_limit(self):
+        depth = 300
+        with tempfile.TemporaryDirectory() as tmp:
+            path = tmp
+            for _ in range(depth):
+                path = os.path.join(path, 'd')
+                os.mkdir(path)
+            limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(depth - 100)
+            try:
+                lines = ftg.generate_tree(tmp).split('\n')
+            finally:
+                sys.setrecursionlimit(limit)
+        self.assertEqual(len(lines), depth + 1)
+        self.assertEqual(lines[-1], "    " * (depth - 1) + "└── d")
+
+
+class RenderTreeTests(unittest.TestCase):
+    def test_plain_and_labelled_nodes(self):
+        nodes = [ftg.TreeNode(0, 'r', 'root', None, True),
+                 ftg.TreeNode(1, 'd', 'dir', None, False),
+                 ftg.TreeNode(2, 'f', 'file', (3, 0.0), False),
+                 ftg.TreeNode(2, 'g', 'file', None, True),
+                 ftg.TreeNode(1, 'l', 'symlink', 't', True)]
+        self.assertEqual(list(ftg.render_tree(nodes)), [
+            "r",
+            "├── d",
+            f"│   ├── f [Size: 3 bytes, Modified: {ftg._format_mtime(0.0)}]",
+            "│   └── g",
+            "└── l -> t",
+        ])
+
+
+@unittest.skipIf(sys.platform == 'win32', "bytes paths are decoded up front on Windows")
+class BytesRootTests(TreeTestCase):
+    def test_matches_str_root(self):
+        root = os.fsencode(self.root)
+        for kwargs in [{}, {'include_hidden': True}, {'show_metadata': True}, {'max_depth': 2},
+                       {'exclusions': ['node_modules', 'a']}]:
+            with self.subTest(**kwargs):
+                self.assertEqual(ftg.generate_tree(root, backend='scandir', **kwargs),
+                                 ftg.generate_tree(self.root, backend='scandir', **kwargs))
+
+    def test_nodes_stay_undecoded(self):
+        nodes = list(ftg.iter_tree(os.fsencode(self.root)))
+        self.assertTrue(all(isinstance(n.name, bytes) for n in nodes))
+        self.assertEqual(ftg.tree_to_json(nodes), ftg.tree_to_json(ftg.iter_tree(self.root)))
+        self.assertEqual(ftg.tree_to_html(nodes), ftg.tree_to_html(ftg.iter_tree(self.root)))
+
+    def test_non_ascii_names_sort_like_str(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ['Ωa', 'αb', 'Éc', 'éa', 'b']:
+                open(os.path.join(tmp, name), 'w').close()
+            for backend in ftg.BACKENDS:
+                with self.subTest(backend=backend):
+                    self.assertEqual(ftg.generate_tree(os.fsencode(tmp), backend=backend),
+                                     ftg.generate_tree(tmp, backend=backend))
+
+    def test_error_nodes_match_str_root(self):
+        missing = os.path.join(self.root, 'missing')
+        self.assertEqual(ftg.generate_tree(os.fsencode(missing)), ftg.generate_tree(missing))
+
+
+class PrefetchTests(TreeTestCase):
+    def test_stops_listing_at_max_depth(self):
+        root_key, listings, shared = ftg._prefetch_listings(self.root, False, frozenset(['node_modules']), 2)
+        st = os.stat(self.root)
+        self.assertEqual(root_key, (st.st_dev, st.st_ino))
+        listed = [sorted(e.name for e in entries) for entries, _ in listings.values()]
+        # The root, a and B; a/b is below max_depth
+        self.assertEqual(len(listings), 3)
+        self.assertIn(['b', 'f.txt'], listed)
+        self.assertIn([], listed)
+        self.assertEqual(shared, set())
+
+    def test_entries_sort_case_insensitively(self):
+        names = [e.name for e in ftg._list_dir(self.root, True, frozenset())]
+        self.assertEqual([n for n in names if n in {'a', 'B', 'Z.py', 'quote"name', '.hid'}],
+                         ['.hid', 'a', 'B', 'quote"name', 'Z.py'])
+
+    def test_output_does_not_depend_on_worker_count(self):
+        expected = ftg.generate_tree(self.root, include_hidden=True)
+        with mock.patch.object(ftg, 'MAX_WORKERS', 1):
+            self.assertEqual(ftg.generate_tree(self.root, include_hidden=True), expected)
+
+
+class _WrappedEntry:
+    """Wraps a DirEntry, delegating everything to it."""
+
+    def __init__(self, entry):
+        self._entry = entry
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+    def is_dir(self, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def stat(self, follow_symlinks=True):
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _NoInodeEntry(_WrappedEntry):
+    """Reports st_dev/st_ino as 0, like DirEntry.stat() on Windows."""
+
+    def stat(self, follow_symlinks=True):
+        st = list(self._entry.stat(follow_symlinks=follow_symlinks))
+        st[1] = st[2] = 0  # st_ino, st_dev
+        return os.stat_result(st)
+
+
+class _AliasEntry(_WrappedEntry):
+    """Stats as another directory, standing in for a bind mount of it."""
+
+    def __init__(self, entry, aliases):
+        super().__init__(entry)
+        self._aliases = aliases
+
+    def stat(self, follow_symlinks=True):
+        if self.path in self._aliases:
+            return os.lstat(self._aliases[self.path])
+        return super().stat(follow_symlinks=follow_symlinks)
+
+
+class _StatCountingEntry(_WrappedEntry):
+    """Records every stat() call by entry name in a shared list."""
+
+    def __init__(self, entry, stats):
+        super().__init__(entry)
+        self._stats = stats
+
+    def stat(self, follow_symlinks=True):
+        self._stats.append(self.name)
+        return super().stat(follow_symlinks=follow_symlinks)
+
+
+class CycleDetectionTests(TreeTestCase):
+    def _with_backend(self, scan, **kwargs):
+        ftg.BACKENDS['wrapped'] = scan
+        try:
+            return ftg.generate_tree(self.root, backend='wrapped', **kwargs)
+        finally:
+            del ftg.BACKENDS['wrapped']
+
+    def test_zero_inode_entries_are_not_circular(self):
+        def scan(path):
+            for entry in ftg._scandir_entries(path):
+                yield _NoInodeEntry(entry)
+
+        tree = self._with_backend(scan)
+        self.assertNotIn("[Circular Link]", tree)
+        self.assertEqual(tree, ftg.generate_tree(self.root))
+
+    @unittest.skipIf(sys.platform == 'win32', "directory keys come from os.stat on Windows")
+    def test_each_directory_is_stat_once(self):
+        stats = []
+
+        def scan(path):
+            for entry in ftg._scandir_entries(path):
+                yield _StatCountingEntry(entry, stats)
+
+        for max_depth, expected in [(None, ['B', 'a', 'b', 'c', 'node_modules', 'x']),
+                                    (2, ['B', 'a', 'node_modules']), (1, [])]:
+            with self.subTest(max_depth=max_depth):
+                del stats[:]
+                tree = self._with_backend(scan, max_depth=max_depth)
+                self.assertEqual(tree, ftg.generate_tree(self.root, max_depth=max_depth))
+                # Directories past max_depth are shown truncated without a stat
+                self.assertEqual(sorted(stats), expected)
+
+    @unittest.skipIf(sys.platform == 'win32', "directory keys come from os.stat on Windows")
+    def test_directory_reached_twice_is_walked_twice(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for parts in [('a', 'D', 'sub'), ('z', 'y', 'x', 'T', 'sub')]:
+                os.makedirs(os.path.join(tmp, *parts))
+                open(os.path.join(tmp, *parts, 'file'), 'w').close()
+            a = os.path.join(tmp, 'a')
+            t = os.path.join(tmp, 'z', 'y', 'x', 'T')
+            aliases = {t: os.path.join(a, 'D')}
+            t_listed = threading.Event()
+
+            def scan(path):
+                if path == t:
+                    t_listed.set()
+                elif path == a:
+                    # List a only once D has been reached at depth 5 through T
+                    t_listed.wait(5)
+                for entry in ftg._scandir_entries(path):
+                    yield _AliasEntry(entry, aliases)
+
+            ftg.BACKENDS['wrapped'] = scan
+            try:
+                for max_depth in [None, 5]:
+                    with self.subTest(max_depth=max_depth):
+                        t_listed.clear()
+                        tree = ftg.generate_tree(tmp, max_depth=max_depth, backend='wrapped')
+                        self.assertTrue(t_listed.is_set())
+                        self.assertEqual(tree, ftg.generate_tree(tmp, max_depth=max_depth))
+                        self.assertNotIn("[Circular Link]", tree)
+            finally:
+                del ftg.BACKENDS['wrapped']
+        self.assertIn("│   └── D\n│       └── sub\n│           └── file", tree)
+
+    @unittest.skipIf(sys.platform == 'win32', "directory keys come from os.stat on Windows")
+    def test_directory_containing_itself_is_circular(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'a', 'b', 'c'))
+            aliases = {os.path.join(tmp, 'a', 'b', 'c'): os.path.join(tmp, 'a')}
+
+            def scan(path):
+                for entry in ftg._scandir_entries(path):
+                    yield _AliasEntry(entry, aliases)
+
+            ftg.BACKENDS['wrapped'] = scan
+            try:
+                nodes = list(ftg.iter_tree(tmp, backend='wrapped'))
+            finally:
+                del ftg.BACKENDS['wrapped']
+        self.assertEqual([(n.depth, n.name) for n in nodes[1:]],
+                         [(1, 'a'), (2, 'b'), (3, 'c'), (4, "[Circular Link]")])
+
+    def test_visited_directory_is_circular(self):
+        st = os.stat(os.path.join(self.root, 'a', 'b'))
+        tree = ftg.generate_tree(self.root, visited={(st.st_dev, st.st_ino)})
+        self.assertIn("│   ├── b\n│   │   [Circular Link]\n│   └── f.txt", tree)
+
+
+class WalkerSpecializationTests(TreeTestCase):
+    def _nodes(self, show_metadata, limit_depth, cancellable, max_depth=None):
+        root_key, listings, shared = ftg._prefetch_listings(self.root, True, frozenset(), max_depth)
+        walk = ftg._get_walker(show_metadata, limit_depth, cancellable)
+        event = threading.Event() if cancellable else None
+        return list(walk(listings, shared, root_key, max_depth if max_depth is not None else 10 ** 9,
+                         set(), event))
+
+    def test_every_block_combination_matches_generic_walk(self):
+        generic = self._nodes(True, True, True)
+        st = os.lstat(os.path.join(self.root, 'Z.py'))
+        z_node = next(n for n in generic if n.depth == 1 and n.name == 'Z.py')
+        self.assertEqual(z_node.meta, (st.st_size, st.st_mtime))
+        for show_metadata, limit_depth, cancellable in itertools.product([False, True], repeat=3):
+            with self.subTest(show_metadata=show_metadata, limit_depth=limit_depth,
+                              cancellable=cancellable):
+                nodes = self._nodes(show_metadata, limit_depth, cancellable)
+                expected = generic
+                if not show_metadata:
+                    expected = [n._replace(meta=None) if n.kind == 'file' else n for n in generic]
+                self.assertEqual(nodes, expected)
+
+    def test_depth_block(self):
+        for cancellable in [False, True]:
+            nodes = self._nodes(False, True, cancellable, max_depth=1)
+            truncated = [n for n in nodes if n.kind == 'truncated']
+            self.assertTrue(truncated)
+            self.assertTrue(all(n.depth == 2 for n in truncated))
+            self.assertEqual(max(n.depth for n in nodes), 2)
+
+    def test_listings_are_consumed(self):
+        root_key, listings, shared = ftg._prefetch_listings(self.root, True, frozenset(), None)
+        walk = ftg._get_walker(False, False, False)
+        self.assertTrue(listings)
+        list(walk(listings, shared, root_key, 10 ** 9, set(), None))
+        self.assertEqual(listings, {})
+
+    def test_missing_listing_raises(self):
+        walk = ftg._get_walker(False, False, False)
+        with self.assertRaises(KeyError):
+            list(walk({}, set(), 'root', 10 ** 9, set(), None))
+
+    def test_cancel_block(self):
+        event = threading.Event()
+        nodes = ftg.iter_tree(self.root, cancel_event=event)
+        next(nodes)
+        event.set()
+        with self.assertRaises(ftg.GenerationCancelled):
+            list(nodes)
+
+    def test_cancelled_before_prefetch(self):
+        event = threading.Event()
+        event.set()
+        with self.assertRaises(ftg.GenerationCancelled):
+            ftg._prefetch_listings(self.root, False, frozenset(), None, cancel_event=event)
+
+
+@unittest.skipUnless('getdents64' in ftg.BACKENDS, "getdents64 backend not available")
+class Getdents64BackendTests(TreeTestCase):
+    def test_matches_scandir(self):
+        for kwargs in [{}, {'include_hidden': True}, {'show_metadata': True}, {'max_depth': 2}]:
+            with self.subTest(**kwargs):
+                self.assertEqual(ftg.generate_tree(self.root, backend='getdents64', **kwargs),
+                                 ftg.generate_tree(self.root, backend='scandir', **kwargs))
+                self.assertEqual(ftg.generate_tree(os.fsencode(self.root), backend='getdents64', **kwargs),
+                                 ftg.generate_tree(self.root, backend='scandir', **kwargs))
+
+    def test_directory_larger_than_one_buffer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            count = ftg._GETDENTS_BUFFER_SIZE // 200 + 50
+            for i in range(count):
+                open(os.path.join(tmp, f"{i:05d}" + "x" * 180), 'w').close()
+            names = sorted(e.name for e in ftg._getdents64_entries(tmp))
+            self.assertEqual(names, sorted(os.listdir(tmp)))
+            self.assertEqual(len(names), count)
+
+    def test_entry_types(self):
+        entries = {e.name: e for e in ftg._getdents64_entries(self.root)}
+        self.assertTrue(entries['a'].is_dir(follow_symlinks=False))
+        self.assertTrue(entries['Z.py'].is_file(follow_symlinks=False))
+        self.assertEqual(entries['Z.py'].stat().st_size, 2)
+        self.assertEqual(entries['a'].path, os.path.join(self.root, 'a'))
+        if 'link' in entries:
+            self.assertTrue(entries['link'].is_symlink())
+            self.assertFalse(entries['link'].is_dir(follow_symlinks=False))
+            self.assertTrue(entries['link'].is_dir())
+
+    def test_path_is_built_on_first_use(self):
+        for root in [self.root, self.root + os.sep]:
+            with self.subTest(root=root):
+                entry = next(e for e in ftg._getdents64_entries(root) if e.name == 'Z.py')
+                self.assertIsNone(entry._path)
+                self.assertEqual(entry.path, os.path.join(self.root, 'Z.py'))
+                self.assertIs(entry.path, entry.path)
+
+
+class PreviewStreamingTests(TreeTestCase):
+    def test_lines_are_sent_in_chunks(self):
+        app = _headless_app()
+        with mock.patch.object(ftg, 'PREVIEW_CHUNK_LINES', 3):
+            app.generate_tree_thread(self.root, [], False, None, False, ftg.TREE_SYMBOLS['Classic'],
+                                     threading.Event())
+        chunks = [args[0] for name, args in app.root.calls if name == '_append_preview']
+        tree = ftg.generate_tree(self.root)
+        self.assertEqual(app.root.calls[-1][0], '_finish_preview')
+        self.assertEqual(len(chunks), -(-len(tree.split('\n')) // 3))
+        self.assertEqual("".join(chunks), tree)
+
+    def test_nodes_are_kept_for_export(self):
+        app = _headless_app()
+        app.generate_tree_thread(self.root, [], False, None, False, ftg.TREE_SYMBOLS['Classic'],
+                                 threading.Event())
+        nodes = [args[0] for name, args in app.root.calls if name == '_finish_preview']
+        self.assertEqual(nodes, [list(ftg.iter_tree(self.root))])
+
+    def test_superseded_scan_sends_nothing(self):
+        app = _headless_app()
+        event = threading.Event()
+        event.set()
+        app.generate_tree_thread(self.root, [], False, None, False, ftg.TREE_SYMBOLS['Classic'], event)
+        self.assertEqual(app.root.calls, [])
+
+    def test_errors_are_reported_on_the_tk_thread(self):
+        app = _headless_app()
+        event = threading.Event()
+        with mock.patch.object(ftg.messagebox, 'showerror') as showerror:
+            # Missing symbols make render_tree fail
+            app.generate_tree_thread(self.root, [], False, None, False, {}, event)
+        showerror.assert_not_called()
+        # The partial tree is never swapped in
+        self.assertEqual([name for name, _ in app.root.calls], ['_report_generation_error'])
+        error, cancel_event = app.root.calls[0][1]
+        self.assertIsInstance(error, KeyError)
+        self.assertIs(cancel_event, event)
+
+
+class WorkerTests(TreeTestCase):
+    def test_jobs_run_on_one_worker_thread(self):
+        app = _headless_app()
+        app._jobs = queue.Queue(maxsize=1)
+        worker = threading.Thread(target=app._worker_loop, daemon=True)
+        worker.start()
+        for count in [1, 2]:
+            app._jobs.put((self.root, [], False, None, False, ftg.TREE_SYMBOLS['Classic'],
+                           threading.Event()))
+            self.assertTrue(app.root.wait_for('_finish_preview', count))
+        self.assertEqual(set(app.root.threads), {worker})
+        self.assertTrue(worker.is_alive())
+
+
+class PreviewWidgetTests(unittest.TestCase):
+    def setUp(self):
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            self.skipTest(f"Tk is not available: {e}")
+        root.withdraw()
+        self.addCleanup(root.destroy)
+        self.app = ftg.FolderTreeGeneratorApp(root)
+
+    def test_finished_scan_is_swapped_in(self):
+        old = self.app.preview_text
+        event = threading.Event()
+        self.app._begin_preview()
+        new = self.app._back_preview
+        self.app._append_preview("root\n└── x", event)
+        self.assertIs(self.app.preview_text, old)
+        nodes = [ftg.TreeNode(0, 'root', 'root', None, True), ftg.TreeNode(1, 'x', 'file', None, True)]
+        self.app._finish_preview(nodes, event)
+        self.assertIs(self.app.preview_text, new)
+        self.assertIs(self.app.tree_nodes, nodes)
+        self.assertIsNone(self.app._back_preview)
+        self.assertEqual(new.get('1.0', 'end-1c'), "root\n└── x")
+        self.assertEqual(str(new.cget('state')), 'disabled')
+        self.assertFalse(old.frame.winfo_exists())
+
+    def test_superseded_back_widget_is_discarded(self):
+        self.app._begin_preview()
+        stale = self.app._back_preview
+        self.app._begin_preview()
+        self.assertFalse(stale.frame.winfo_exists())
+        self.assertIsNot(self.app._back_preview, stale)
+
+    def test_failed_scan_keeps_previous_preview(self):
+        old = self.app.preview_text
+        nodes = self.app.tree_nodes = [ftg.TreeNode(0, 'r', 'root', None, True)]
+        event = threading.Event()
+        self.app._begin_preview()
+        back = self.app._back_preview
+        self.app._append_preview("partial", event)
+        with mock.patch.object(ftg.messagebox, 'showerror') as showerror:
+            self.app._report_generation_error(OSError("boom"), event)
+        showerror.assert_called_once()
+        self.assertIs(self.app.preview_text, old)
+        self.assertIs(self.app.tree_nodes, nodes)
+        self.assertIsNone(self.app._back_preview)
+        self.assertFalse(back.frame.winfo_exists())
+
+
+class PreviewSwapTests(TreeTestCase):
+    def test_scan_is_swapped_in_when_finished(self):
+        app = _headless_preview_app()
+        old = app.preview_text
+        event = threading.Event()
+        app._begin_preview()
+        new = app._back_preview
+        with mock.patch.object(ftg, 'PREVIEW_CHUNK_LINES', 3):
+            app.generate_tree_thread(self.root, [], False, None, False, ftg.TREE_SYMBOLS['Classic'], event)
+        for name, args in app.root.calls:
+            if name == '_finish_preview':
+                self.assertIs(app.preview_text, old)
+                self.assertEqual(new.text, ftg.generate_tree(self.root))
+            getattr(app, name)(*args)
+        self.assertIs(app.preview_text, new)
+        self.assertIsNone(app._back_preview)
+        self.assertEqual(app.tree_nodes, list(ftg.iter_tree(self.root)))
+        self.assertTrue(new.packed)
+        self.assertEqual(new.state, 'disabled')
+        self.assertFalse(old.packed)
+        self.assertFalse(old.frame.winfo_exists())
+        app.progress_bar.pack_forget.assert_called_once_with()
+
+    def test_superseded_scan_is_not_swapped_in(self):
+        app = _headless_preview_app()
+        old = app.preview_text
+        event = threading.Event()
+        app._begin_preview()
+        stale = app._back_preview
+        event.set()
+        app._append_preview("partial", event)
+        app._finish_preview([ftg.TreeNode(0, 'r', 'root', None, True)], event)
+        self.assertIs(app.preview_text, old)
+        self.assertEqual(app.tree_nodes, [])
+        self.assertEqual(stale.text, "")
+        # The next scan's _begin_preview discards it
+        app._begin_preview()
+        self.assertFalse(stale.frame.winfo_exists())
+        self.assertIsNot(app._back_preview, stale)
+
+    def test_failed_scan_keeps_previous_preview(self):
+        nodes = [ftg.TreeNode(0, 'r', 'root', None, True)]
+        app = _headless_preview_app(nodes)
+        old = app.preview_text
+        event = threading.Event()
+        app._begin_preview()
+        back = app._back_preview
+        app._append_preview("partial", event)
+        with mock.patch.object(ftg.messagebox, 'showerror') as showerror:
+            app._report_generation_error(OSError("boom"), event)
+        showerror.assert_called_once()
+        self.assertIs(app.preview_text, old)
+        self.assertTrue(old.packed)
+        self.assertEqual(app.tree_nodes, nodes)
+        self.assertIsNone(app._back_preview)
+        self.assertFalse(back.frame.winfo_exists())
+
+
+class DebounceTests(unittest.TestCase):
+    def test_typing_regenerates_once(self):
+        app = _headless_app()
+        app._pending_preview = None
+        for _ in range(3):
+            app.schedule_preview()
+        self.assertEqual([name for name, _ in app.root.calls], ['_run_scheduled_preview'] * 3)
+        self.assertEqual(app.root.cancelled, [0, 1])
+        self.assertEqual(app._pending_preview, 2)
+
+        with mock.patch.object(app, 'update_preview') as update_preview:
+            app._run_scheduled_preview()
+        update_preview.assert_called_once_with()
+        self.assertIsNone(app._pending_preview)
+
+
+class ExportTests(TreeTestCase):
+    def test_json_follows_tree_nesting(self):
+        nodes = list(ftg.iter_tree(self.root, max_depth=2, exclusions=['node_modules']))
+        tree = ftg.tree_to_json(nodes)
+        self.assertEqual(tree['name'], self.root)
+        a = tree['children'][0]
+        self.assertEqual([child['name'] for child in a['children']], ['b', 'f.txt'])
+        self.assertEqual(a['children'][0]['children'], [{'name': '...', 'children': []}])
+        self.assertEqual(tree['children'][1], {'name': 'B', 'children': []})
+
+    def test_json_stream_matches_json_dumps(self):
+        trees = [
+            list(ftg.iter_tree(self.root)),
+            list(ftg.iter_tree(self.root, include_hidden=True, show_metadata=True)),
+            list(ftg.iter_tree(self.root, max_depth=1)),
+            list(ftg.iter_tree(os.path.join(self.root, 'B'))),
+            list(ftg.iter_tree(os.path.join(self.root, 'missing'))),
+            [ftg.TreeNode(0, 'r', 'root', None, True),
+             ftg.TreeNode(1, 'a', 'dir', None, False),
+             ftg.TreeNode(2, 'b', 'dir', None, True),
+             ftg.TreeNode(3, 'c\n"\\\t', 'file', None, True),
+             ftg.TreeNode(1, '😀', 'file', None, True)],
+            [],
+        ]
+        for nodes in trees:
+            for indent in [4, 2, 0]:
+                with self.subTest(nodes=nodes[:2], indent=indent):
+                    self.assertEqual("".join(ftg.iter_tree_json(nodes, indent=indent)),
+                                     json.dumps(ftg.tree_to_json(nodes), indent=indent))
+
+    def test_html_nesting(self):
+        nodes = list(ftg.iter_tree(self.root, max_depth=1, exclusions=['node_modules']))
+        html = ftg.tree_to_html(nodes)
+        self.assertEqual(html.count("<ul>"), html.count("</ul>"))
+        self.assertEqual(html.count("<li>"), html.count("</li>"))
+        self.assertIn("<li>quote&quot;name</li>", html)
+
+
+class SearchIndexTests(unittest.TestCase):
+    def test_indices_are_case_insensitive_per_line(self):
+        self.assertEqual(ftg._search_indices("ab\nxAB\n", "ab"),
+                         [('1.0', '1.0+2c'), ('2.1', '2.1+2c')])
+
+    @unittest.skipUnless(ftg._TK_COUNTS_UTF16, "Tk counts characters, not UTF-16 units")
+    def test_non_bmp_characters_count_as_two(self):
+        self.assertEqual(ftg._search_indices("x\n😀ab😀ab", "ab"),
+                         [('2.2', '2.2+2c'), ('2.6', '2.6+2c')])
+        self.assertEqual(ftg._search_indices("a😀b", "😀b"), [('1.1', '1.1+3c')])
+
+
+if __name__ == '__main__':
+    unittest.main()